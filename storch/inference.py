@@ -6,7 +6,8 @@ from storch.util import print_graph, magic_box
 import storch
 
 
-_cost_tensors: [CostTensor] = []
+# Registered cost nodes, together with their plates in reverse topological order
+_cost_tensors: [Tuple[CostTensor, [storch.Plate]]] = []
 _sampling_methods: [storch.method.Method] = []
 
 
@@ -99,22 +100,56 @@ def add_cost(cost: Union[Tensor, torch.Tensor], name: str):
             )
         cost = CostTensor(cost._tensor, [cost], cost.plates, name)
     if torch.is_grad_enabled():
-        storch.inference._cost_tensors.append(cost)
+        cost_plates = list(storch.order_plates(cost.multi_dim_plates(), reverse=True))
+        storch.inference._cost_tensors.append((cost, cost_plates))
     return cost
 
 
-def surrogate_loss(debug: bool = False) -> storch.Tensor:
-    costs: [storch.Tensor] = storch.inference._cost_tensors
+def _collect_stochastic_parents(
+    costs: [Tuple[CostTensor, [storch.Plate]]]
+) -> [[StochasticTensor]]:
+    """
+    Collects the stochastic parents of each cost node, starting from the parents furthest up in the graph.
+    """
+    # Instance check here instead of parent.stochastic, as backward methods are only used on these.
+    return [
+        [
+            parent
+            for parent in c.walk_parents(depth_first=False, reverse=True)
+            if isinstance(parent, StochasticTensor)
+        ]
+        for c, _ in costs
+    ]
+
+
+def surrogate_loss(
+    debug: bool = False, *, _stochastic_parents: [[StochasticTensor]] = None
+) -> storch.Tensor:
+    """
+    Args:
+        debug: Prints the stochastic computation graph.
+        _stochastic_parents: Internal. The stochastic parents of each registered cost node, as computed by
+            :func:`_collect_stochastic_parents`. Must be in the same order as :attr:`_cost_tensors`.
+            If None, they are collected from the graph.
+    """
+    costs = storch.inference._cost_tensors
     if not costs:
         raise RuntimeError("No cost nodes registered for backward call.")
     if debug:
-        print_graph(costs)
+        print_graph([c for c, _ in costs])
+    stochastic_parents = _stochastic_parents
+    if stochastic_parents is None:
+        stochastic_parents = _collect_stochastic_parents(costs)
 
-    # Sum of averages of cost node tensors
+    # Terms of the surrogate loss for all cost nodes. These are summed at once to keep the autograd graph shallow
     surrogate_losses = []
+    # Bind the estimator functions once per method, as many stochastic parents share the same method
+    method_fns = {}
+    # Plates of the stochastic parents, shared between cost nodes that have the same parent
+    parent_plate_cache = {}
 
     # Loop over different cost nodes
-    for c in costs:
+    for (c, cost_plates), parents in zip(costs, stochastic_parents):
         # Do not detach the weights when reducing. This is used in for example expectations to weight the
         # different costs.
         # reduced_cost = storch.reduce_plates(c, detach_weights=False)
@@ -126,82 +161,106 @@ def surrogate_loss(debug: bool = False) -> storch.Tensor:
         # if reduced_cost.requires_grad:
         #     accum_loss += reduced_cost
 
-        L = c._tensor.new_tensor(0.0)
-        surrogate_loss_c = 0.0
+        # Sum of the gradient functions of the parents. None stands for an empty sum, for which magic_box(L) is 1, so
+        # that no zero tensor has to be allocated for costs without gradient functions.
+        L = None
+        # Parents often share the same plates, so reuse the cost reduced over the same set of plates
+        reduced_costs = {}
         # Walk topologically through the graph
         # This is a parallelized implementation of Algorithm 1 in the paper
-        for parent in c.walk_parents(depth_first=False, reverse=True):
-            # Instance check here instead of parent.stochastic, as backward methods are only used on these.
-            if not isinstance(parent, StochasticTensor):
-                continue
+        for parent in parents:
             if not parent.requires_grad or not parent.method:
                 continue
+            if parent.method not in method_fns:
+                method_fns[parent.method] = (
+                    parent.method.is_pathwise,
+                    parent.method._estimator,
+                )
+            is_pathwise, estimator = method_fns[parent.method]
 
-            if parent.method.is_pathwise(parent, c):
+            if is_pathwise(parent, c):
                 continue
             # Transpose the parent stochastic tensor, so that its shape is the same as the cost but the event shape, and
             # possibly extra dimensions...?
-            parent_tensor = parent._tensor
-            reduced_cost = c
-            parent_plates = parent.multi_dim_plates()
+            if parent in parent_plate_cache:
+                parent_plates, parent_plate_index = parent_plate_cache[parent]
+            else:
+                parent_plates = tuple(parent.multi_dim_plates())
+                # Plate names are unique within a tensor, so index the plates of the parent by name
+                parent_plate_index = {
+                    plate.name: i for i, plate in enumerate(parent_plates)
+                }
+                parent_plate_cache[parent] = (parent_plates, parent_plate_index)
             # Reduce all plates that are in the cost node but not in the parent node
-            for plate in storch.order_plates(c.multi_dim_plates(), reverse=True):
-                if not plate.is_in(parent_plates):
-                    reduced_cost = plate.reduce(reduced_cost, detach_weights=True)
-            # Align the parent tensor so that the plate dimensions are in the same order as the cost tensor
-            # TODO: This can probably be implemented with torch.movedim
-            for index_c, plate in enumerate(reduced_cost.multi_dim_plates()):
-                index_p = plate.index_in(parent_plates)
-                if index_c != index_p:
-                    parent_tensor = parent_tensor.transpose(index_p, index_c)
-                    parent_plates[index_p], parent_plates[index_c] = (
-                        parent_plates[index_c],
-                        parent_plates[index_p],
-                    )
-            # Add empty (k=1) plates to new parent
-            for plate in parent.plates:
-                if not plate.is_in(parent_plates):
-                    parent_plates.append(plate)
-
-            # Create new storch Tensors with different order of plates for the cost and parent
-            new_parent = storch.tensor.StochasticTensor(
-                parent_tensor,
-                [],
-                parent_plates,
-                parent.name,
-                parent.n,
-                parent.distribution,
-                parent._requires_grad,
-                parent.method,
-            )
-            new_parent.param_grads = parent.param_grads
-            # Fake the new parent to be the old parent within the graph by mimicking its place in the graph
-            new_parent._parents = parent._parents
-            for p, has_link in new_parent._parents:
-                p._children.append((new_parent, has_link))
-            new_parent._children = parent._children
+            reduce_plates = [
+                plate for plate in cost_plates if plate.name not in parent_plate_index
+            ]
+            reduce_key = tuple(plate.name for plate in reduce_plates)
+            if reduce_key in reduced_costs:
+                reduced_cost = reduced_costs[reduce_key]
+            else:
+                reduced_cost = storch.Plate.reduce_many(
+                    c, reduce_plates, detach_weights=True
+                )
+                reduced_costs[reduce_key] = reduced_cost
+            reduced_plates = reduced_cost.multi_dim_plates()
+            # Align the parent tensor so that the plate dimensions are in the same order as the cost tensor, followed
+            # by the plates of the parent that are not in the cost tensor
+            permutation = [parent_plate_index[plate.name] for plate in reduced_plates]
+            aligned = set(permutation)
+            permutation += [i for i in range(len(parent_plates)) if i not in aligned]
+            if permutation == list(range(len(permutation))):
+                # The plates of the parent are already in the order of the cost tensor, so it can be used directly
+                new_parent = parent
+            else:
+                parent_tensor = parent._tensor.permute(
+                    permutation + list(range(len(permutation), parent._tensor.ndim))
+                )
+                parent_plates = [parent_plates[i] for i in permutation]
+                # Add empty (k=1) plates to new parent
+                parent_plates += [plate for plate in parent.plates if plate.n == 1]
+
+                # Create new storch Tensors with different order of plates for the cost and parent
+                new_parent = storch.tensor.StochasticTensor(
+                    parent_tensor,
+                    [],
+                    parent_plates,
+                    parent.name,
+                    parent.n,
+                    parent.distribution,
+                    parent._requires_grad,
+                    parent.method,
+                )
+                new_parent.param_grads = parent.param_grads
+                # Fake the new parent to be the old parent within the graph by mimicking its place in the graph
+                new_parent._parents = parent._parents
+                for p, has_link in new_parent._parents:
+                    p._children.append((new_parent, has_link))
+                new_parent._children = parent._children
 
             # Compute the estimator
-            (gradient_function, control_variate,) = parent.method._estimator(
+            (gradient_function, control_variate,) = estimator(
                 new_parent, reduced_cost
             )
 
             if gradient_function is not None:
-                L = L + gradient_function
+                L = gradient_function if L is None else L + gradient_function
             # Compute control variate
             if control_variate is not None:
-                final_A = magic_box(L) * control_variate
+                final_A = control_variate if L is None else magic_box(L) * control_variate
                 final_A = storch.reduce_plates(
                     final_A,
                     detach_weights=False,  # TODO: Should this boolean be false or true?
                 )
                 if final_A.ndim == 1:
                     final_A = final_A.squeeze(0)
-                surrogate_loss_c += final_A
+                surrogate_losses.append(final_A)
         # Use magic box to distribute the cost to gradient function
-        surrogate_loss_c += storch.reduce_plates(magic_box(L) * c, detach_weights=False)
-        # Collect surrogate losses for all costs
-        surrogate_losses.append(surrogate_loss_c)
+        surrogate_losses.append(
+            storch.reduce_plates(
+                c if L is None else magic_box(L) * c, detach_weights=False
+            )
+        )
     SL = torch.sum(torch.stack(surrogate_losses))
     return SL
 
@@ -225,21 +284,20 @@ def backward(
         torch.Tensor: The average total cost normalized by the sampling weights.
     """
 
-    SL = surrogate_loss(debug)
+    # Walk the graph once, and share the stochastic parents with the surrogate loss
+    stochastic_parents = _collect_stochastic_parents(storch.inference._cost_tensors)
+    SL = surrogate_loss(debug, _stochastic_parents=stochastic_parents)
     _create_graph = create_graph
 
     stochastic_nodes = set()
-    costs: [storch.Tensor] = storch.inference._cost_tensors
-    for c in costs:
-        for parent in c.walk_parents():
-            # Instance check here instead of parent.stochastic, as backward methods are only used on these.
-            if isinstance(parent, StochasticTensor):
-                stochastic_nodes.add(parent)
-                if parent.requires_grad and parent.method:
-                    create_higher_order_graph = (
-                        parent.method.should_create_higher_order_graph()
-                    )
-                    _create_graph = create_higher_order_graph or _create_graph
+    for parents in stochastic_parents:
+        for parent in parents:
+            stochastic_nodes.add(parent)
+            if parent.requires_grad and parent.method:
+                create_higher_order_graph = (
+                    parent.method.should_create_higher_order_graph()
+                )
+                _create_graph = create_higher_order_graph or _create_graph
     if isinstance(SL, storch.Tensor) and SL._tensor.requires_grad:
         SL._tensor.backward(create_graph=_create_graph)
 
@@ -259,7 +317,7 @@ def backward(
 def reset() -> None:
     # Free the SC graph links. This often improves garbage collection for larger graphs.
     # Unfortunately Python's GC seems to have imperfect cycle detection?
-    for c in storch.inference._cost_tensors:
+    for c, _ in storch.inference._cost_tensors:
         c._clean()
 
     storch.inference._cost_tensors = []
@@ -26,11 +26,15 @@ class MovingAverageBaseline(Baseline):
     def compute_baseline(
         self, tensor: StochasticTensor, cost_node: CostTensor
     ) -> torch.Tensor:
-        avg_cost = storch.reduce_plates(cost_node).detach()
-        self.moving_average = (
-            self.exponential_decay * self.moving_average
-            + (1 - self.exponential_decay) * avg_cost
-        )._tensor
+        avg_cost = storch.reduce_plates(cost_node).detach()._tensor
+        # lerp requires equal dtypes, so promote them like the multiply-add it replaces would
+        dtype = torch.result_type(self.moving_average, avg_cost)
+        # Computed out of place, as the previous moving average may still be used by the gradient estimator
+        self.moving_average = torch.lerp(
+            self.moving_average.to(dtype),
+            avg_cost.to(dtype),
+            (1 - self.exponential_decay).to(dtype),
+        )
         return self.moving_average
 
 
@@ -50,5 +54,13 @@ class BatchAverageBaseline(Baseline):
         costs = costs.detach()
         sum_costs = storch.sum(costs, tensor.name)
         # TODO: Should reduce correctly
-        baseline = (sum_costs - costs) / (tensor.n - 1)
+        baseline = _leave_one_out_average(sum_costs, costs, tensor.n)
         return baseline
+
+
+@storch.deterministic
+def _leave_one_out_average(
+    sum_costs: torch.Tensor, costs: torch.Tensor, n: int
+) -> torch.Tensor:
+    # The difference is a new tensor, so it can be divided in place
+    return (sum_costs - costs).div_(n - 1)
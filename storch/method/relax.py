@@ -143,7 +143,8 @@ class LAX(Reparameterization):
             d_variance = torch.autograd.grad(
                 [var_loss._tensor], self.control_params, retain_graph=True,
             )
-            print(d_variance)
+            if storch._debug:
+                print(d_variance)
 
             for i in range(len(self.control_params)):
                 self.control_params[i].backward(d_variance[i])
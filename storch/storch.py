@@ -122,22 +122,9 @@ def reduce_plates(
         The reduced tensor
     """
     tensor, plates = _handle_inputs(tensor, plates)
-    for plate in order_plates(plates, reverse=True):
-        tensor = plate.reduce(tensor, detach_weights=detach_weights)
-
-    return tensor
-
-
-def _isroot(plate: storch.Plate, plates: [storch.Plate]):
-    """
-    Returns true if the plate is a root of the list of plates.
-    """
-    for parent in plate.parents:
-        if parent in plates:
-            return False
-        if not _isroot(parent, plates):
-            return False
-    return True
+    return storch.Plate.reduce_many(
+        tensor, order_plates(plates, reverse=True), detach_weights=detach_weights
+    )
 
 
 def order_plates(plates: [storch.Plate], reverse=False):
@@ -146,31 +133,35 @@ def order_plates(plates: [storch.Plate], reverse=False):
     Uses Kahn's algorithm.
     """
     sorted = []
-    roots = []
+    # Also order the ancestors of the plates that are not in the list, for example parents of size 1. These are
+    # needed to find the global topological ordering, and otherwise the plates depending on them are never released.
+    all_plates = {p.name: p for p in plates}
+    plate_names = set(all_plates)
+    to_visit = [_p for p in plates for _p in p.parents]
+    while to_visit:
+        p = to_visit.pop()
+        if p.name not in all_plates:
+            all_plates[p.name] = p
+            to_visit.extend(p.parents)
     in_edges = {}
-    out_edges = {p.name: [] for p in plates}
-    for p in plates:
-        if _isroot(p, plates):
-            roots.append(p)
-        in_edges[p.name] = p.parents.copy()
-        for _p in p.parents:
-            if _p.name in out_edges:
-                out_edges[_p.name].append(p)
-            # This is possible if the input list of plates does not contain the parent. We still need to register it
-            # to make sure the list is sorted in global topological ordering!
-            else:
-                out_edges[_p.name] = []
+    out_edges = {name: [] for name in all_plates}
+    for p in all_plates.values():
+        in_edges[p.name] = {_p.name for _p in p.parents}
+        for name in in_edges[p.name]:
+            out_edges[name].append(p)
+    roots = [p for p in reversed(list(all_plates.values())) if not p.parents]
     while roots:
         n = roots.pop()
-        if n in plates:
+        # Plates in the list are the ones in all_plates, so compare by name
+        if n.name in plate_names:
             sorted.append(n)
         for m in out_edges[n.name]:
             remaining_edges = in_edges[m.name]
-            remaining_edges.remove(n)
+            remaining_edges.discard(n.name)
             if not remaining_edges:
                 roots.append(m)
     for remaining_edges in in_edges.values():
-        if remaining_edges and any(map(lambda p: p in plates, remaining_edges)):
+        if remaining_edges:
             raise ValueError("List of plates contains a cycle")
     if reverse:
         return reversed(sorted)
@@ -76,6 +76,17 @@ class Plate:
         if detach_weights:
             plate_weighting = self.weight.detach()
         if self.n == 1:
+            # Fast path for unweighted unit plates: The plate has no dimension in the tensor, so only remove the plate.
+            # Only checks the weight if it is on the CPU, to prevent synchronizing with the device.
+            if (
+                not isinstance(plate_weighting, storch.Tensor)
+                and not plate_weighting.requires_grad
+                and plate_weighting.device.type == "cpu"
+                and plate_weighting.numel() == 1
+                and plate_weighting.item() == 1.0
+            ):
+                plates = [plate for plate in tensor.plates if plate.name != self.name]
+                return Tensor(tensor._tensor, [tensor], plates, tensor.name)
             return storch.reduce(lambda x: x * plate_weighting, self.name)(tensor)
         # Case: The weight is a single number. First sum, then multiply with the weight (usually taking the mean)
         elif plate_weighting.ndim == 0:
@@ -100,6 +111,52 @@ class Plate:
             weighted_tensor = tensor * plate_weighting
             return storch.sum(weighted_tensor, self)
 
+    @staticmethod
+    def reduce_many(
+        tensor: storch.Tensor, plates: Iterable[Plate], detach_weights=True
+    ) -> storch.Tensor:
+        """
+        Reduces the tensor over the given plates in the given order. Consecutive plates that are weighted by a single
+        number are reduced together using one sum.
+
+        Args:
+            tensor (storch.Tensor): The tensor to reduce
+            plates ([Plate]): The plates to reduce, in the order of reduction
+            detach_weights: Whether to detach the weighting of the samples from the graph
+
+        Returns:
+            storch.Tensor: The reduced tensor
+        """
+        fused_plates = []
+        for plate in plates:
+            if (
+                type(plate).reduce is Plate.reduce
+                and plate.n > 1
+                and not isinstance(plate.weight, storch.Tensor)
+                and plate.weight.ndim == 0
+            ):
+                fused_plates.append(plate)
+                continue
+            tensor = Plate._reduce_fused(tensor, fused_plates, detach_weights)
+            fused_plates = []
+            tensor = plate.reduce(tensor, detach_weights=detach_weights)
+        return Plate._reduce_fused(tensor, fused_plates, detach_weights)
+
+    @staticmethod
+    def _reduce_fused(
+        tensor: storch.Tensor, plates: List[Plate], detach_weights: bool
+    ) -> storch.Tensor:
+        if len(plates) == 0:
+            return tensor
+        if len(plates) == 1:
+            return plates[0].reduce(tensor, detach_weights=detach_weights)
+        plate_weighting = plates[0].weight
+        for plate in plates[1:]:
+            plate_weighting = plate_weighting * plate.weight
+        if detach_weights:
+            plate_weighting = plate_weighting.detach()
+        return storch.sum(tensor, plates) * plate_weighting
+
     def on_collecting_args(self, plates: [Plate]) -> bool:
         """
         Gets called after a wrapper collected plates from its input arguments.
@@ -341,7 +398,7 @@ class Tensor:
             S = [self]
             while S:
                 v = S.pop()
-                if repeat_visited or not v.is_in(visited):
+                if repeat_visited or v not in visited:
                     yield walk_fn(v)
                     visited.add(v)
                     for w, d in expand_fn(v):
@@ -358,7 +415,7 @@ class Tensor:
                 else:
                     yield walk_fn(v)
                 for w, d in expand_fn(v):
-                    if (repeat_visited or not w.is_in(visited)) and (
+                    if (repeat_visited or w not in visited) and (
                         d or not only_differentiable
                     ):
                         visited.add(w)
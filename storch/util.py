@@ -30,38 +30,28 @@ def magic_box(l: Tensor):
 def print_graph(costs: [CostTensor]):
     nodes = topological_sort(costs)
     counters = {"s": 1, "c": 1, "d": 1}
+    # Name all nodes up front. topological_sort returns all ancestors of the costs, so this includes all parents
     names = {}
-
-    def get_name(node, names):
-        if node in names:
-            return names[node]
+    for node in nodes:
         if node.name:
-            if node.name not in counters:
-                counters[node.name] = 1
-                name = node.name + "[" + str(0) + "]"
-            else:
-                name = node.name + "[" + str(counters[node.name]) + "]"
-                counters[node.name] += 1
+            prefix = node.name
         elif node.stochastic:
-            name = "s" + "[" + str(counters["s"]) + "]"
-            counters["s"] += 1
+            prefix = "s"
         elif node.is_cost:
-            name = "c" + "[" + str(counters["c"]) + "]"
-            counters["c"] += 1
+            prefix = "c"
         else:
-            name = "d" + "[" + str(counters["d"]) + "]"
-            counters["d"] += 1
-        names[node] = name
-        return name
+            prefix = "d"
+        index = counters.get(prefix, 0)
+        counters[prefix] = index + 1
+        names[node] = prefix + "[" + str(index) + "]"
 
     for node in nodes:
-        name = get_name(node, names)
-        print(name, node)
+        print(names[node], node)
     for node in nodes:
-        name = get_name(node, names)
+        name = names[node]
         for p, differentiable in node._parents:
             edge = "-D->" if differentiable else "-X->"
-            print(get_name(p, names) + edge + name)
+            print(names[p] + edge + name)
 
 
 def get_distr_parameters(
@@ -92,16 +82,17 @@ def get_distr_parameters(
     return params
 
 
-def _walk_backward_graph(grad: torch.Tensor) -> Iterable[torch.Tensor]:
-    visited = set()
-    to_visit = deque()
-    to_visit.append(grad)
+def _walk_backward_graph(*grads: torch.Tensor) -> Iterable[torch.Tensor]:
+    # Mark gradient functions as visited when they are queued, so that shared subgraphs are only queued once
+    visited = set(map(id, grads))
+    to_visit = deque(grads)
     while to_visit:
         n = to_visit.popleft()
-        if n and n not in visited:
-            yield n
-            visited.add(n)
-            to_visit.extend([f for f, _ in n.next_functions])
+        yield n
+        for f, _ in n.next_functions:
+            if f is not None and id(f) not in visited:
+                visited.add(id(f))
+                to_visit.append(f)
 
 
 def walk_backward_graph(tensor: torch.Tensor) -> Iterable[torch.Tensor]:
@@ -126,35 +117,35 @@ def has_backwards_path(output: Tensor, inputs: [Tensor]) -> [bool]:
     has_paths = [False for _ in inputs]
     if not output_t.grad_fn:
         return has_paths
+    outputs_t = [output_t]
     if isinstance(output, StochasticTensor):
-        params = get_distr_parameters(output.distribution).values()
-        for param in params:
-            # Run this function for each parameter and collect with or
-            has_paths = [a or b for (a, b) in zip(has_paths, has_backwards_path(param, inputs))]
-        return has_paths
-    to_search = []
+        # Search from all parameters at once, so that subgraphs shared between parameters are walked only once
+        outputs_t = [
+            param._tensor if isinstance(param, Tensor) else param
+            for param in get_distr_parameters(output.distribution).values()
+        ]
+    # Map the gradient function (or the leaf variable) of each input to search to its index
+    to_search = {}
     for i, input in enumerate(inputs):
         if isinstance(input, Tensor):
             input = input._tensor
-        if output_t is input:
+        if any(t is input for t in outputs_t):
             # This can happen if the input is a parameter of the output distribution
             has_paths[i] = True
         else:
-            to_search.append((i, input))
-    if len(to_search) == 0:
-        return False
-    for p in walk_backward_graph(output_t):
-        found_i = None
-        for j, (i, input) in enumerate(to_search):
-            if hasattr(p, "variable") and p.variable is input:
-                found_i = i
-                break
-            elif input.grad_fn and p is input.grad_fn:
-                found_i = i
-                break
-        if found_i:
-            del to_search[j]
-            has_paths[found_i] = True
+            if input.grad_fn:
+                to_search.setdefault(id(input.grad_fn), []).append(i)
+            to_search.setdefault(id(input), []).append(i)
+    grads = [t.grad_fn for t in outputs_t if t.grad_fn]
+    if len(to_search) == 0 or not grads:
+        return has_paths
+    for p in _walk_backward_graph(*grads):
+        found = to_search.pop(id(p), None)
+        if found is None and hasattr(p, "variable"):
+            found = to_search.pop(id(p.variable), None)
+        if found is not None:
+            for i in found:
+                has_paths[i] = True
             if all(has_paths):
                 # If we know all inputs are linked, we don't need to explore the rest of the computation graph
                 return has_paths
@@ -179,25 +170,25 @@ def topological_sort(costs: [CostTensor]) -> [Tensor]:
             raise ValueError(
                 "The inputs of the topological sort should only contain cost nodes."
             )
+    # Count the outgoing edges of each node that lead towards the cost nodes
+    remaining = {}
+    to_visit = list(costs)
+    while to_visit:
+        n = to_visit.pop()
+        for (p, _) in n._parents:
+            if p in remaining:
+                remaining[p] += 1
+            else:
+                remaining[p] = 1
+                to_visit.append(p)
     l = []
-    s = costs.copy()
-    edges = {}
+    s = deque(costs)
     while s:
-        n = s.pop()
+        n = s.popleft()
         l.append(n)
         for (p, _) in n._parents:
-            if p in edges:
-                children = edges[p]
-            else:
-                children = list(map(lambda ch: ch[0], p._children))
-                edges[p] = children
-            c = -1
-            for i, _c in enumerate(children):
-                if _c is n:
-                    c = i
-                    break
-            del children[c]
-            if not children:
+            remaining[p] -= 1
+            if remaining[p] == 0:
                 s.append(p)
     return l
 
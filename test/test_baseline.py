@@ -0,0 +1,22 @@
+import pytest
+import torch
+import storch
+from torch.distributions import Bernoulli
+from storch.method import ScoreFunction
+from storch.method.baseline import MovingAverageBaseline
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+def test_moving_average_dtype(dtype):
+    torch.manual_seed(0)
+    p = torch.tensor(0.3, dtype=dtype, requires_grad=True)
+    method = ScoreFunction("z", n_samples=4, baseline_factory="moving_average")
+    for _ in range(2):
+        z = method(Bernoulli(p))
+        storch.add_cost(z, "cost")
+        storch.backward()
+    baseline = next(
+        m for m in method.modules() if isinstance(m, MovingAverageBaseline)
+    )
+    assert baseline.moving_average.dtype == dtype
+    assert p.grad is not None and p.grad.dtype == dtype
@@ -0,0 +1,106 @@
+import torch
+import storch
+from torch.distributions import Normal
+from storch.method import ScoreFunction
+from storch.tensor import StochasticTensor
+from storch.util import magic_box
+
+
+def transpose_align(
+    parent: StochasticTensor, reduced_cost: storch.Tensor
+) -> StochasticTensor:
+    """
+    Aligns the plates of the parent with the cost by swapping dimensions one by one.
+    """
+    parent_tensor = parent._tensor
+    parent_plates = parent.multi_dim_plates()
+    for index_c, plate in enumerate(reduced_cost.multi_dim_plates()):
+        index_p = plate.index_in(parent_plates)
+        if index_c != index_p:
+            parent_tensor = parent_tensor.transpose(index_p, index_c)
+            parent_plates[index_p], parent_plates[index_c] = (
+                parent_plates[index_c],
+                parent_plates[index_p],
+            )
+    for plate in parent.plates:
+        if not plate.is_in(parent_plates):
+            parent_plates.append(plate)
+    return StochasticTensor(
+        parent_tensor,
+        [],
+        parent_plates,
+        parent.name,
+        parent.n,
+        parent.distribution,
+        parent._requires_grad,
+        parent.method,
+    )
+
+
+def test_surrogate_loss_plate_alignment():
+    torch.manual_seed(0)
+    mu = torch.tensor(0.1, requires_grad=True)
+    estimator_calls = []
+
+    def sample(name, n, mean):
+        method = ScoreFunction(name, n_samples=n, baseline_factory="none")
+        # Record the tensors the estimator receives from surrogate_loss
+        method._estimator = lambda tensor, cost: (
+            estimator_calls.append((tensor, cost)),
+            method.estimator(tensor, cost),
+        )[1]
+        return method(Normal(mean, 1.0))
+
+    a = sample("a", 2, mu)
+    b = sample("b", 3, mu)
+    # Unit plate that ends up between the plates of c
+    s1 = sample("s1", 1, mu)
+    c = sample("c", 4, a + s1 + b + mu)
+    samples = {"a": a, "b": b, "s1": s1, "c": c}
+    assert [plate.name for plate in c.plates] == ["c", "a", "s1", "b"]
+
+    # Plates of the cost in a different order than those of c
+    f = b * c * a
+    assert [plate.name for plate in f.multi_dim_plates()] == ["b", "c", "a"]
+    # Costs without the plate b of c: Once aligned with c and once in a different order
+    g = storch.reduce_plates(c * a, plates=["b"])
+    h = storch.reduce_plates(a * c, plates=["b"])
+    storch.add_cost(f, "f")
+    storch.add_cost(g, "g")
+    storch.add_cost(h, "h")
+    storch.inference.surrogate_loss()
+
+    for tensor, reduced_cost in estimator_calls:
+        parent = samples[tensor.name]
+        cost_plates = [plate.name for plate in reduced_cost.multi_dim_plates()]
+        parent_plates = [plate.name for plate in parent.multi_dim_plates()]
+        # The plates of the cost come first, in the same order, and no plates are lost
+        assert [
+            plate.name for plate in tensor.multi_dim_plates()[: len(cost_plates)]
+        ] == cost_plates
+        assert {plate.name for plate in tensor.plates} == {
+            plate.name for plate in parent.plates
+        }
+        if parent_plates[: len(cost_plates)] == cost_plates:
+            # Already aligned, so the parent itself is passed to the estimator
+            assert tensor is parent
+        else:
+            assert tensor is not parent
+
+        # The gradients should be equal to those of the parent aligned by swapping dimensions
+        grads = []
+        for p in [tensor, transpose_align(parent, reduced_cost)]:
+            log_prob, _ = p.method.estimator(p, reduced_cost)
+            term = storch.reduce_plates(
+                magic_box(log_prob) * reduced_cost, detach_weights=False
+            )
+            grads.append(torch.autograd.grad(term._tensor, mu, retain_graph=True)[0])
+        assert torch.allclose(grads[0], grads[1])
+
+    # All four samples are parents of all three costs
+    assert len(estimator_calls) == 3 * 4
+    c_calls = [t for t, _ in estimator_calls if t.name == "c"]
+    # f has a different plate order than c, h reorders the plates of c without b and g is aligned with c
+    assert sum(1 for t in c_calls if t is c) == 1
+    assert sum(1 for t in c_calls if t is not c) == 2
+    storch.reset()
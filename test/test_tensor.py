@@ -28,6 +28,96 @@ def test_on_unwrap_tensor(plate, n):
     assert False
 
 
+def test_order_plates_unit_parent():
+    a = Plate("a", 2, [])
+    unit = Plate("unit", 1, [a])
+    b = Plate("b", 3, [a, unit])
+    c = Plate("c", 4, [b])
+    # The plate of size 1 is not passed, but b still depends on it
+    ordered = storch.order_plates([c, b, a])
+    assert [plate.name for plate in ordered] == ["a", "b", "c"]
+    assert all(any(p is plate for p in [a, b, c]) for plate in ordered)
+
+
+@pytest.mark.parametrize("detach_weights", [True, False])
+def test_reduce_many(detach_weights):
+    torch.manual_seed(0)
+    weights = [
+        torch.tensor(1.0 / 3, requires_grad=True),
+        torch.tensor(0.25, requires_grad=True),
+        torch.tensor([0.3, 0.7], requires_grad=True),
+        torch.tensor(0.2, requires_grad=True),
+        torch.tensor(0.5, requires_grad=True),
+    ]
+    # Two consecutive scalar-weight plates, a vector-weighted plate and again two scalar-weight plates
+    plates = [
+        Plate(name, n, [], weight)
+        for name, n, weight in zip(["a", "b", "v", "d", "e"], [3, 4, 2, 5, 2], weights)
+    ]
+    value = torch.randn(3, 4, 2, 5, 2, 6, requires_grad=True)
+
+    def reduce(fused: bool):
+        tensor = storch.Tensor(value, [], plates, "test")
+        if fused:
+            reduced = Plate.reduce_many(tensor, reversed(plates), detach_weights)
+        else:
+            reduced = tensor
+            for plate in reversed(plates):
+                reduced = plate.reduce(reduced, detach_weights=detach_weights)
+        assert reduced.plates == []
+        grads = torch.autograd.grad(
+            reduced._tensor.sum(), [value] + weights, allow_unused=True
+        )
+        return reduced._tensor, grads
+
+    fused, fused_grads = reduce(True)
+    sequential, sequential_grads = reduce(False)
+    assert torch.allclose(fused, sequential)
+    for fused_grad, sequential_grad in zip(fused_grads, sequential_grads):
+        if detach_weights and sequential_grad is None:
+            assert fused_grad is None
+        else:
+            assert torch.allclose(fused_grad, sequential_grad)
+
+
+@pytest.mark.parametrize(
+    "weight,detach_weights,fast",
+    [
+        (torch.tensor(1.0), True, True),
+        (torch.tensor(0.5), True, False),
+        (torch.tensor(1.0, requires_grad=True), False, False),
+        # The weight no longer requires grad once it is detached
+        (torch.tensor(1.0, requires_grad=True), True, True),
+    ],
+)
+def test_reduce_unit_plate(monkeypatch, weight, detach_weights, fast):
+    torch.manual_seed(0)
+    unit = Plate("unit", 1, [], weight)
+    plates = [Plate("a", 3, []), unit, Plate("b", 4, [])]
+    tensor = storch.Tensor(torch.randn(3, 4, 2), [], plates, "test")
+    generic = storch.reduce(
+        lambda x: x * (weight.detach() if detach_weights else weight), unit.name
+    )(tensor)
+
+    generic_calls = []
+    storch_reduce = storch.reduce
+
+    def spy_reduce(fn, plates):
+        generic_calls.append(plates)
+        return storch_reduce(fn, plates)
+
+    monkeypatch.setattr(storch, "reduce", spy_reduce)
+    reduced = unit.reduce(tensor, detach_weights=detach_weights)
+    assert len(generic_calls) == (0 if fast else 1)
+    assert torch.equal(reduced._tensor, generic._tensor)
+    assert [plate.name for plate in reduced.plates] == [
+        plate.name for plate in generic.plates
+    ]
+    if fast:
+        assert reduced._tensor is tensor._tensor
+        assert len(reduced._parents) == 1 and reduced._parents[0][0] is tensor
+
+
 def to_storch(tensor: torch.Tensor) -> storch.Tensor:
     return storch.Tensor(tensor, [], [], "test")
 
@@ -0,0 +1,80 @@
+import gc
+import weakref
+
+import pytest
+import torch
+import storch
+from torch.distributions import Normal
+from storch.method import ScoreFunction
+from storch.tensor import CostTensor
+from storch.util import topological_sort, print_graph, has_backwards_path
+
+
+def to_storch(parents, name) -> storch.Tensor:
+    return storch.Tensor(torch.tensor([0.1, 0.2]), parents, [], name)
+
+
+@pytest.fixture
+def graph():
+    # a -> b -> cost_1, a -> c -> cost_2, b -> c, and a side branch a -> side that does not lead to a cost
+    a = to_storch([], "a")
+    b = to_storch([a], "b")
+    c = to_storch([a, b], "c")
+    side = to_storch([a], "side")
+    cost_1 = CostTensor(b._tensor, [b], [], "cost_1")
+    cost_2 = CostTensor(c._tensor, [c], [], "cost_2")
+    return [cost_1, cost_2], [a, b, c, cost_1, cost_2], side
+
+
+def test_topological_sort(graph):
+    costs, ancestors, side = graph
+    order = topological_sort(costs)
+    # Every ancestor of the costs is returned exactly once, including those with children that do not lead to a cost
+    assert len(order) == len(ancestors)
+    for node in ancestors:
+        assert sum(1 for n in order if n is node) == 1
+    assert not any(n is side for n in order)
+    # Children come before their parents
+    position = {id(n): i for i, n in enumerate(order)}
+    for node in order:
+        for p, _ in node._parents:
+            assert position[id(node)] < position[id(p)]
+
+
+def test_print_graph(graph, capsys):
+    costs, ancestors, _ = graph
+    print_graph(costs)
+    edges = [l for l in capsys.readouterr().out.splitlines() if "->" in l]
+    assert len(edges) == sum(len(n._parents) for n in ancestors)
+
+
+def test_has_backwards_path_first_input():
+    a = torch.tensor([0.1, 0.2], requires_grad=True)
+    b = torch.tensor([0.3, 0.4], requires_grad=True)
+    x = a * 2
+    # The first input was previously never marked as found
+    assert has_backwards_path(x.sum(), [a, b]) == [True, False]
+    assert has_backwards_path(x.sum(), [x, b]) == [True, False]
+
+
+def test_has_backwards_path_empty_search():
+    a = torch.tensor([0.1, 0.2], requires_grad=True)
+    x = a * 2
+    # Nothing is left to search if all inputs are the output itself
+    assert has_backwards_path(x, [x]) == [True]
+
+
+def test_distribution_collected_after_no_grad_sampling():
+    mu = torch.tensor(0.1, requires_grad=True)
+    distributions = []
+    for _ in range(50):
+        with torch.no_grad():
+            a = ScoreFunction("a", n_samples=4)(Normal(mu, 1.0))
+            d = Normal(a + 1, 1.0)
+            ScoreFunction("b", n_samples=2)(d)
+        distributions.append(weakref.ref(d))
+        storch.reset()
+    del a, d
+    gc.collect()
+    # The parameters of d link to the sample a, so nothing that outlives the graph may hold on to them
+    assert sum(1 for ref in distributions if ref() is not None) == 0